@@ -1,6 +1,7 @@
 import os
 import re
-import json
+import orjson
+import signal
 import subprocess
 import streamlit as st
 from dotenv import load_dotenv
@@ -17,6 +18,9 @@ st.title("Generate & Check Pytest Tests from README")
 os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY", "")
 llm = ChatGroq(model="qwen/qwen3-32b")  # you can switch models here
 
+# Per-test limit enforced by pytest-timeout
+TEST_TIMEOUT_SEC = 5
+
 # --------------------- Prompt Template -------------------
 prompt_template = """
 You are an AI that generates Python pytest test files.
@@ -25,6 +29,7 @@ Task:
 - Given the README content below, write a single Python file named `test_generated.py`.
 - If the described functions do not exist, create simple placeholder implementations inside the same file.
 - Then write ONLY {num_tests} pytest test functions that validate the described functionality.
+- Each test must finish within {timeout_sec} seconds (no sleeps, network calls or input()).
 - Output ONLY valid Python code. No markdown, no explanations, no comments.
 
 README:
@@ -33,46 +38,63 @@ README:
 
 prompt = PromptTemplate(
     input_variables=["readme_content", "num_tests"],
+    partial_variables={"timeout_sec": TEST_TIMEOUT_SEC},
     template=prompt_template,
 )
 chain = LLMChain(llm=llm, prompt=prompt)
 
 # --------------------- Helpers ---------------------------
+_PYTEST_RE = re.compile(r"<PYTEST_FILE>([\s\S]*?)</PYTEST_FILE>", re.IGNORECASE)
+_CODE_BLOCK_RE = re.compile(r"```(?:python)?\s*([\s\S]*?)```", re.IGNORECASE)
+_TEST_DEF_RE = re.compile(r"^\s*def\s+test_", re.M)
+_TEST_BLOCK_RE = re.compile(r"(^\s*def\s+test_[\s\S]*?)(?=^\s*def\s+test_|\Z)", re.M)
+
 def extract_code(raw: str) -> str:
     """Extract code inside <PYTEST_FILE>...</PYTEST_FILE>, else fallback to ```python``` blocks."""
-    m = re.search(r"<PYTEST_FILE>([\s\S]*?)</PYTEST_FILE>", raw, re.IGNORECASE)
+    m = _PYTEST_RE.search(raw)
     if m:
         return m.group(1).strip()
-    blocks = re.findall(r"```(?:python)?\s*([\s\S]*?)```", raw, flags=re.IGNORECASE)
+    blocks = _CODE_BLOCK_RE.findall(raw)
     if blocks:
         return max(blocks, key=len).strip()
     return raw.strip()
 
 def keep_at_most_n_tests(code: str, n: int) -> str:
     """Keep imports/header + first n test functions."""
-    first_test = re.search(r"^\s*def\s+test_", code, flags=re.M)
+    first_test = _TEST_DEF_RE.search(code)
     if not first_test:
         return code
     header = code[: first_test.start()]
     body = code[first_test.start():]
-    pattern = re.compile(r"(^\s*def\s+test_[\s\S]*?)(?=^\s*def\s+test_|\Z)", re.M)
-    tests = pattern.findall(body)
+    tests = _TEST_BLOCK_RE.findall(body)
     trimmed = "".join(tests[:n])
     return header + trimmed
 
 def ensure_min_tests(code: str, min_tests: int) -> int:
-    return len(re.findall(r"^\s*def\s+test_", code, flags=re.M))
+    return len(_TEST_DEF_RE.findall(code))
 
 def run_pytest_json(test_file: str, timeout_sec: int = 60):
     """Run pytest with JSON report; returns (exit_ok, report_dict, stdout, stderr)."""
-    cmd = ["pytest", test_file, "--disable-warnings", "--maxfail=10", "--json-report", "-q"]
-    proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout_sec)
+    # The signal method fails just the hung test; the thread method os._exit()s
+    # pytest before the report is written, so it is only used where SIGALRM is missing.
+    timeout_method = "signal" if hasattr(signal, "SIGALRM") else "thread"
+    cmd = ["pytest", test_file, "--disable-warnings", "--maxfail=10", "--json-report", "-q",
+           "-p", "no:cacheprovider", "-p", "no:randomly", "--no-header",
+           f"--timeout={TEST_TIMEOUT_SEC}", f"--timeout-method={timeout_method}"]
+    # The generated file is rewritten every run, so its bytecode is never reused
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
     report_path = ".report.json"
+    # A run that dies before writing its report must not show the previous run's
+    try:
+        os.remove(report_path)
+    except FileNotFoundError:
+        pass
+    proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout_sec, env=env)
     report = None
     if os.path.exists(report_path):
         try:
-            with open(report_path, "r", encoding="utf-8") as f:
-                report = json.load(f)
+            with open(report_path, "rb") as f:
+                report = orjson.loads(f.read())
         except Exception:
             report = None
     return (proc.returncode == 0, report, proc.stdout, proc.stderr)
@@ -127,7 +149,7 @@ with right:
 uploaded_file = left.file_uploader("Upload README.md", type=["md", "txt"])
 
 if uploaded_file:
-    readme_content = uploaded_file.read().decode("utf-8", errors="ignore")
+    readme_content = uploaded_file.getvalue().decode("utf-8", errors="ignore")
     with st.expander("📄 README Preview", expanded=True):
         st.markdown(f"```markdown\n{readme_content}\n```")
 
@@ -161,7 +183,7 @@ if uploaded_file:
             try:
                 ok, report, stdout, stderr = run_pytest_json(test_path, timeout_sec=90)
             except FileNotFoundError:
-                st.error("`pytest` or `pytest-json-report` not installed. Install with:\n\n`pip install pytest pytest-json-report`")
+                st.error("`pytest`, `pytest-json-report` or `pytest-timeout` not installed. Install with:\n\n`pip install pytest pytest-json-report pytest-timeout`")
                 st.stop()
             except subprocess.TimeoutExpired:
                 st.error("Pytest timed out (90s). Your tests may hang or be too slow.")
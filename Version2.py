@@ -1,8 +1,16 @@
 import os
 import re
-import json
-import subprocess
+import ast
+import orjson
+import asyncio
+import signal
+import queue
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
 from typing import TypedDict, Annotated
+import httpx
 import streamlit as st
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
@@ -10,6 +18,8 @@ from langchain_core.messages import HumanMessage, SystemMessage
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
 
+import pytest_worker
+
 # ------------------------- Setup -------------------------
 load_dotenv()
 st.set_page_config(page_title="Function-Based Unit Test Generator", layout="wide")
@@ -17,9 +27,32 @@ st.title("🧪 Function-Based Pytest Test Generator with LangGraph")
 
 # --- LangChain / Groq ---
 os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY", "")
-llm_generator = ChatGroq(model="openai/gpt-oss-20b", temperature=0.2)
-llm_critic = ChatGroq(model="meta-llama/llama-4-maverick-17b-128e-instruct", temperature=0.1)
-llm_reporter = ChatGroq(model="qwen/qwen3-32b", temperature=0.3)
+
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """A long-lived event loop on a daemon thread.
+    
+    The cached Groq clients keep their async connection pool bound to the loop
+    that first used it, so the workflow always runs here instead of in a fresh
+    asyncio.run() loop per click.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="workflow-loop", daemon=True).start()
+    return loop
+
+@st.cache_resource
+def get_llms():
+    """Build the Groq clients once per server process, sharing one keep-alive HTTP/2 pool."""
+    http_client = httpx.AsyncClient(http2=True, limits=httpx.Limits(max_keepalive_connections=20))
+    return (
+        # JSON mode: the generator replies with {"code": "..."} instead of tagged markdown
+        ChatGroq(model="openai/gpt-oss-20b", temperature=0.2, http_async_client=http_client,
+                 model_kwargs={"response_format": {"type": "json_object"}}),
+        ChatGroq(model="meta-llama/llama-4-maverick-17b-128e-instruct", temperature=0.1, http_async_client=http_client),
+        ChatGroq(model="qwen/qwen3-32b", temperature=0.3, http_async_client=http_client),
+    )
+
+llm_generator, llm_critic, llm_reporter = get_llms()
 
 # --------------------- State Definition -------------------
 class AgentState(TypedDict):
@@ -37,86 +70,186 @@ class AgentState(TypedDict):
     feedback: str
     status: str
     final_message: str
-    history: list
+    history: deque
+    speculative_repair: bool
+    speculative_ready: bool
+    refresh_llm_cache: bool
 
 # --------------------- Helper Functions -------------------
+# Function-name patterns, compiled once. Each is paired with a literal that every one of its
+# matches contains, so a pattern whose literal is missing from the README is skipped outright.
+_FUNC_RES = (
+    # def function_name( in code blocks (also covers method signatures)
+    ('def', re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(')),
+    # `function_name()` or `function_name(args)`
+    ('`', re.compile(r'`([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)`')),
+    # ### function_name(args) - headers with function calls
+    ('###', re.compile(r'###\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(')),
+    # function_name(args) at start of line (not in code blocks)
+    ('(', re.compile(r'^\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)(?:\s*$|\s*[-:])', re.MULTILINE)),
+    # **function_name(args)** in bold
+    ('**', re.compile(r'\*\*([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)\*\*')),
+    # - function_name(args) in lists
+    ('(', re.compile(r'[-•]\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\(')),
+)
+# Same list with '-' as the only bullet: re has a fast search for a leading literal but not
+# for a leading character class, so READMEs without '•' use these.
+_FUNC_RES_DASH = tuple(
+    (literal, re.compile(pattern.pattern.replace('[-•]', '-', 1), pattern.flags))
+    for literal, pattern in _FUNC_RES
+)
+
+_THINK_RE = re.compile(r"<think>.*?</think>", re.DOTALL | re.IGNORECASE)
+_FENCE_RE = re.compile(r"```(?:python)?", re.IGNORECASE)
+_PYTEST_RE = re.compile(r"<PYTEST_FILE>([\s\S]*?)</PYTEST_FILE>", re.IGNORECASE)
+
 def extract_functions_from_readme(readme: str) -> list:
     """Extract function names from README using multiple patterns."""
-    functions = []
-    
-    # Pattern 1: def function_name( in code blocks
-    pattern1 = r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\('
-    functions.extend(re.findall(pattern1, readme))
-    
-    # Pattern 2: function_name(self) in method signatures
-    pattern2 = r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(self'
-    functions.extend(re.findall(pattern2, readme))
-    
-    # Pattern 3: `function_name()` or `function_name(args)`
-    pattern3 = r'`([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)`'
-    functions.extend(re.findall(pattern3, readme))
-    
-    # Pattern 4: ### function_name(args) or ### function_name - headers with function calls
-    pattern4 = r'###\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\('
-    functions.extend(re.findall(pattern4, readme))
-    
-    # Pattern 5: function_name(args) at start of line (not in code blocks)
-    pattern5 = r'^\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)(?:\s*$|\s*[-:])'
-    functions.extend(re.findall(pattern5, readme, re.MULTILINE))
-    
-    # Pattern 6: **function_name(args)** in bold
-    pattern6 = r'\*\*([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)\*\*'
-    functions.extend(re.findall(pattern6, readme))
-    
-    # Pattern 7: - function_name(args) in lists
-    pattern7 = r'[-•]\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\('
-    functions.extend(re.findall(pattern7, readme))
-    
-    # Remove duplicates while preserving order
+    # Remove duplicates while preserving order, stopping once the cap is reached
     seen = set()
     unique_functions = []
-    for func in functions:
-        # Skip private methods and common non-function words
-        if func not in seen and not func.startswith('_') and func.lower() not in ['module', 'key', 'class', 'object', 'property', 'input', 'output', 'returns', 'return']:
-            seen.add(func)
-            unique_functions.append(func)
-    
-    return unique_functions[:15]  # Max 20 functions
+    for literal, pattern in (_FUNC_RES if '•' in readme else _FUNC_RES_DASH):
+        if literal not in readme:
+            continue
+        for func in pattern.findall(readme):
+            # Skip private methods and common non-function words
+            if func not in seen and not func.startswith('_') and func.lower() not in ['module', 'key', 'class', 'object', 'property', 'input', 'output', 'returns', 'return']:
+                seen.add(func)
+                unique_functions.append(func)
+                if len(unique_functions) >= 15:  # Max 15 functions
+                    return unique_functions
+    
+    return unique_functions
+
+def first_json_obj(text: str):
+    """Return the first balanced {...} block in text (ignoring braces inside strings), or None."""
+    start = text.find("{")
+    if start == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
 
 def extract_code(raw: str) -> str:
     """Clean the LLM output and extract pure Python code."""
     if not raw:
         return ""
     
-    raw = re.sub(r"<think>.*?</think>", "", raw, flags=re.DOTALL | re.IGNORECASE)
-    raw = re.sub(r"```(?:python)?", "", raw, flags=re.IGNORECASE)
-    raw = re.sub(r"```", "", raw)
+    raw = _THINK_RE.sub("", raw)
+    raw = _FENCE_RE.sub("", raw)
     raw = raw.strip()
     
-    match = re.search(r"<PYTEST_FILE>([\s\S]*?)</PYTEST_FILE>", raw, re.IGNORECASE)
+    match = _PYTEST_RE.search(raw)
     if match:
         return match.group(1).strip()
     
     return raw.strip()
 
-def run_pytest_json(test_file: str, timeout_sec: int = 60):
-    """Run pytest and parse JSON report."""
-    cmd = ["pytest", test_file, "--disable-warnings", "--maxfail=20", "--json-report", "-q"]
+def parse_generated_code(content: str) -> str:
+    """Read the test file from the generator's JSON reply, falling back to free-form cleanup."""
+    try:
+        return orjson.loads(content)["code"].strip()
+    except (orjson.JSONDecodeError, KeyError, TypeError, AttributeError):
+        return extract_code(content)
+
+LLM_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "testgen")
+LLM_CACHE_MAX_ENTRIES = 512
+
+def prune_llm_cache() -> None:
+    """Delete the least recently used responses once the cache holds more than LLM_CACHE_MAX_ENTRIES."""
+    try:
+        entries = [(e.stat().st_mtime, e.path) for e in os.scandir(LLM_CACHE_DIR) if e.name.endswith(".json")]
+    except OSError:
+        return
+    if len(entries) <= LLM_CACHE_MAX_ENTRIES:
+        return
+    entries.sort()
+    for _, path in entries[:len(entries) - LLM_CACHE_MAX_ENTRIES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+async def cached_ainvoke(llm, messages: list, refresh: bool = False) -> str:
+    """Invoke the LLM, reusing the on-disk response for an identical model + prompt unless refresh is set."""
+    key_source = f"{llm.model_name}|{llm.temperature}|" + "\n".join(m.content for m in messages)
+    key = hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+    cache_path = os.path.join(LLM_CACHE_DIR, f"{key}.json")
+    
+    if not refresh and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                content = orjson.loads(f.read())["content"]
+            # Touch the entry so pruning evicts by last use
+            os.utime(cache_path)
+            return content
+        except (OSError, ValueError, KeyError):
+            pass
+    
+    # A refreshed call overwrites the stored response
+    content = (await llm.ainvoke(messages)).content
     try:
-        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout_sec)
-        report = None
-        if os.path.exists(".report.json"):
-            with open(".report.json", "r", encoding="utf-8") as f:
-                report = json.load(f)
-        return (proc.returncode, report, proc.stdout, proc.stderr)
+        os.makedirs(LLM_CACHE_DIR, exist_ok=True)
+        with open(cache_path, "wb") as f:
+            f.write(orjson.dumps({"model": llm.model_name, "content": content}))
+    except OSError:
+        pass
+    prune_llm_cache()
+    return content
+
+TEST_TIMEOUT_SEC = 5
+
+def write_text(path: str, content: str) -> None:
+    """Write a UTF-8 text file."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+async def run_pytest_json(test_file: str, timeout_sec: int = 60):
+    """Run pytest in the persistent worker and return its JSON report."""
+    # The signal method fails just the hung test; the thread method would
+    # os._exit() the shared worker, so it is only used where SIGALRM is missing.
+    timeout_method = "signal" if hasattr(signal, "SIGALRM") else "thread"
+    args = [test_file, "--disable-warnings", "--maxfail=20", "-q",
+            "-p", "no:cacheprovider", "-p", "no:randomly", "--no-header",
+            f"--timeout={TEST_TIMEOUT_SEC}", f"--timeout-method={timeout_method}"]
+    module_name = os.path.splitext(os.path.basename(test_file))[0]
+    pool = pytest_worker.get_pool()
+    try:
+        result = pool.apply_async(pytest_worker.run_pytest, (args, module_name))
+        # Wait from a thread so the event loop keeps serving other coroutines
+        return await asyncio.to_thread(result.get, timeout_sec)
+    except multiprocessing.TimeoutError:
+        # A hung test would block the worker forever, so replace it
+        pytest_worker.reset_pool()
+        return (-1, None, "", f"Pytest timed out after {timeout_sec}s")
     except Exception as e:
         return (-1, None, "", str(e))
 
 # --------------------- Agent Nodes -------------------
 
-def function_detector_node(state: AgentState) -> AgentState:
+async def function_detector_node(state: AgentState) -> AgentState:
     """Detect functions from README."""
-    functions = extract_functions_from_readme(state["readme_content"])
+    # Scan in a worker thread so LLM calls from other sessions on the shared loop keep flowing
+    functions = await asyncio.to_thread(extract_functions_from_readme, state["readme_content"])
     
     state["detected_functions"] = functions
     state["num_functions"] = len(functions)
@@ -128,26 +261,20 @@ def function_detector_node(state: AgentState) -> AgentState:
     
     return state
 
-def generator_node(state: AgentState) -> AgentState:
-    """Generator Agent - Creates test code with one test per function."""
-    
-    feedback_text = state.get("feedback", "")
-    previous_code_text = ""
-    
-    if state.get("test_code"):
-        # Only show preview of previous code
-        previous_code_text = f"\nPREVIOUS CODE (first 1000 chars):\n{state['test_code'][:1000]}"
-    
-    if not feedback_text:
-        feedback_text = "Generate comprehensive unit tests based on the README."
+def build_generator_prefix(state: AgentState) -> SystemMessage:
+    """Build the generator's system message.
     
+    Everything that stays fixed across iterations (instructions, functions, README)
+    goes here so the provider can serve it from its prompt cache; only the human
+    message changes from one iteration to the next.
+    """
     # Create concise function list
     function_list = ", ".join(state["detected_functions"])
     
     # Truncate README if too long
     readme_preview = state['readme_content'][:3000]
     
-    prompt = f"""
+    static_prefix = f"""
 Expert Python test generator.
 
 FUNCTIONS ({state['num_functions']}): {function_list}
@@ -159,12 +286,10 @@ REQUIREMENTS:
 4. Self-contained file (no external imports)
 5. Add imports: pytest, typing.Callable, Union, Tuple
 6. Implement WORKING placeholder functions (not just raise NotImplementedError)
-
-FEEDBACK: {feedback_text}
+7. Each test must finish within {TEST_TIMEOUT_SEC} seconds (no sleeps, network calls or input())
 
 README (preview):
 {readme_preview}
-{previous_code_text}
 
 Generate test_generated.py with:
 - Imports at top
@@ -173,10 +298,8 @@ Generate test_generated.py with:
 
 CRITICAL: Placeholder implementations must be functional and make tests PASS, not raise errors.
 
-Return ONLY code in:
-<PYTEST_FILE>
-code here
-</PYTEST_FILE>
+Return ONLY a JSON object with the complete file as a string:
+{{"code": "import pytest\\n..."}}
 
 ✅ Self-contained, executable Python
 ✅ EXACTLY {state['num_functions']} tests
@@ -185,31 +308,95 @@ code here
 ❌ No NotImplementedError or pass statements
 """
     
-    messages = [HumanMessage(content=prompt)]
-    response = llm_generator.invoke(messages)
-    test_code = extract_code(response.content)
+    return SystemMessage(content=static_prefix)
+
+def build_generator_messages(state: AgentState, feedback_text: str) -> list:
+    """Build the generator messages for the current state and feedback."""
+    previous_code_text = ""
+    
+    if state.get("test_code"):
+        # Only show preview of previous code
+        previous_code_text = f"\nPREVIOUS CODE (first 1000 chars):\n{state['test_code'][:1000]}"
+    
+    if not feedback_text:
+        feedback_text = "Generate comprehensive unit tests based on the README."
+    
+    dynamic_suffix = f"""
+FEEDBACK: {feedback_text}
+{previous_code_text}
+"""
+    
+    return [build_generator_prefix(state), HumanMessage(content=dynamic_suffix)]
+
+def build_missing_tests_messages(state: AgentState, missing: list) -> list:
+    """Build generator messages asking only for the tests that are missing from the current file."""
+    numbered = ", ".join(f"test{state['detected_functions'].index(func) + 1}_{func}" for func in missing)
+    
+    dynamic_suffix = f"""
+The current test file already covers the other functions but is missing tests for: {', '.join(missing)}
+
+CURRENT FILE:
+{state['test_code']}
+
+For this request do NOT return the whole file. Return only the code to APPEND to it:
+- exactly {len(missing)} new test functions named {numbered}
+- any placeholder implementations or imports those tests need that the file lacks
+
+Return ONLY a JSON object: {{"code": "..."}}
+"""
+    
+    return [build_generator_prefix(state), HumanMessage(content=dynamic_suffix)]
+
+def find_missing_functions(state: AgentState) -> list:
+    """Detected functions without a test in the current file ([] if it can't be parsed or has no tests)."""
+    try:
+        tree = ast.parse(state.get("test_code", ""))
+    except SyntaxError:
+        return []
+    
+    existing = [node.name for node in ast.walk(tree)
+                if isinstance(node, ast.FunctionDef) and node.name.startswith("test")]
+    if not existing:
+        return []
+    return [func for func in state["detected_functions"] if not any(func in name for name in existing)]
+
+async def generator_node(state: AgentState) -> AgentState:
+    """Generator Agent - Creates test code with one test per function."""
+    
+    # A wrong test count usually means a few tests are missing - add just those
+    missing = find_missing_functions(state) if state.get("status") == "incomplete" else []
+    
+    if missing:
+        messages = build_missing_tests_messages(state, missing)
+        content = await cached_ainvoke(llm_generator, messages, state.get("refresh_llm_cache", False))
+        state["test_code"] = state["test_code"].rstrip() + "\n\n\n" + parse_generated_code(content) + "\n"
+        action = f"Appended {len(missing)} missing test functions: {', '.join(missing)}"
+    else:
+        messages = build_generator_messages(state, state.get("feedback", ""))
+        content = await cached_ainvoke(llm_generator, messages, state.get("refresh_llm_cache", False))
+        state["test_code"] = parse_generated_code(content)
+        action = f"Generated {state['num_functions']} test functions"
     
-    state["test_code"] = test_code
     state["history"].append({
         "iteration": state["iteration"],
         "agent": "generator",
-        "action": f"Generated {state['num_functions']} test functions"
+        "action": action
     })
     
     return state
 
-def execution_node(state: AgentState) -> AgentState:
+async def execution_node(state: AgentState) -> AgentState:
     """Execution Engine - Runs pytest."""
     
-    with open("test_generated.py", "w", encoding="utf-8") as f:
-        f.write(state["test_code"])
+    await asyncio.to_thread(write_text, "test_generated.py", state["test_code"])
     
-    return_code, report, stdout, stderr = run_pytest_json("test_generated.py", 90)
+    return_code, report, stdout, stderr = await run_pytest_json("test_generated.py", 90)
     
     state["return_code"] = return_code
     state["report"] = report or {}
-    state["pytest_output"] = stdout
-    state["pytest_stderr"] = stderr
+    # Keep only the tails; pytest prints its summary last
+    state["pytest_output"] = stdout[-4000:]
+    state["pytest_stderr"] = stderr[-2000:]
     state["history"].append({
         "iteration": state["iteration"],
         "agent": "executor",
@@ -227,7 +414,7 @@ def execution_node(state: AgentState) -> AgentState:
     
     return state
 
-def critic_node(state: AgentState) -> AgentState:
+async def critic_node(state: AgentState) -> AgentState:
     """Reflection Agent - Analyzes results and decides next step."""
     
     summary = state["report"].get("summary", {})
@@ -240,6 +427,7 @@ def critic_node(state: AgentState) -> AgentState:
     if collected == state['num_functions'] and passed == collected and failed == 0 and errors == 0:
         state["status"] = "success"
         state["feedback"] = "All tests passed successfully"
+        state["speculative_ready"] = False
         state["history"].append({
             "iteration": state["iteration"],
             "agent": "critic",
@@ -247,8 +435,8 @@ def critic_node(state: AgentState) -> AgentState:
         })
         return state
     
-    # Truncate long outputs
-    pytest_output = state["pytest_output"][:2000] if state["pytest_output"] else ""
+    # Truncate long outputs; stdout keeps its tail, where pytest prints the summary
+    pytest_output = state["pytest_output"][-2000:] if state["pytest_output"] else ""
     pytest_stderr = state["pytest_stderr"][:1000] if state["pytest_stderr"] else ""
     test_code_preview = state["test_code"][:1500] if state["test_code"] else ""
     
@@ -293,16 +481,29 @@ Return ONLY valid JSON.
 """
     
     messages = [HumanMessage(content=prompt)]
-    response = llm_critic.invoke(messages)
+    
+    # Speculatively draft a repair while the critic is still thinking
+    repair_task = None
+    if state.get("speculative_repair"):
+        repair_feedback = f"Previous run: {passed}/{collected} passed, {failed} failed, {errors} errors. Fix the failing tests.\n{pytest_output[-1000:]}"
+        repair_messages = build_generator_messages(state, repair_feedback)
+        repair_task = asyncio.create_task(cached_ainvoke(llm_generator, repair_messages, state.get("refresh_llm_cache", False)))
     
     try:
-        json_match = re.search(r'\{.*\}', response.content, re.DOTALL)
-        if json_match:
-            result = json.loads(json_match.group())
-        else:
-            result = {"status": "test_error", "feedback": "Could not parse critic response"}
-    except:
-        result = {"status": "test_error", "feedback": "Error parsing critic response"}
+        content = await cached_ainvoke(llm_critic, messages, state.get("refresh_llm_cache", False))
+    except Exception:
+        if repair_task:
+            repair_task.cancel()
+        raise
+    
+    json_text = first_json_obj(content)
+    if json_text is None:
+        result = {"status": "test_error", "feedback": "Could not parse critic response"}
+    else:
+        try:
+            result = orjson.loads(json_text)
+        except orjson.JSONDecodeError:
+            result = {"status": "test_error", "feedback": "Error parsing critic response"}
     
     state["status"] = result.get("status", "unknown")
     state["feedback"] = result.get("feedback", result.get("message", ""))
@@ -314,10 +515,24 @@ Return ONLY valid JSON.
 
     if state["status"] in ["test_error", "incomplete"]:
         state["iteration"] += 1
+    
+    state["speculative_ready"] = False
+    if repair_task:
+        if state["status"] in ["test_error", "incomplete"]:
+            repair_content = await repair_task
+            state["test_code"] = parse_generated_code(repair_content)
+            state["speculative_ready"] = True
+            state["history"].append({
+                "iteration": state["iteration"],
+                "agent": "generator",
+                "action": f"Generated {state['num_functions']} test functions (speculative repair)"
+            })
+        else:
+            repair_task.cancel()
 
     return state
 
-def reporter_node(state: AgentState) -> AgentState:
+async def reporter_node(state: AgentState) -> AgentState:
     """Reporting Agent - Formats final output."""
     
     summary = state.get("report", {}).get("summary", {})
@@ -325,8 +540,8 @@ def reporter_node(state: AgentState) -> AgentState:
     passed = summary.get("passed", 0)
     failed = summary.get("failed", 0)
     
-    # Truncate outputs if too long
-    pytest_output = state.get('pytest_output', '')[:1000]
+    # Truncate outputs if too long, keeping the end of stdout with pytest's summary
+    pytest_output = state.get('pytest_output', '')[-1000:]
     pytest_stderr = state.get('pytest_stderr', '')[:1000]
     
     prompt = f"""
@@ -353,10 +568,10 @@ Provide ONLY the final report text without any internal thoughts or analysis.
 """
     
     messages = [HumanMessage(content=prompt)]
-    response = llm_reporter.invoke(messages)
+    content = await cached_ainvoke(llm_reporter, messages, state.get("refresh_llm_cache", False))
     
     # Remove any <think> tags from the response
-    clean_response = re.sub(r'<think>.*?</think>', '', response.content, flags=re.DOTALL | re.IGNORECASE)
+    clean_response = _THINK_RE.sub('', content)
     clean_response = clean_response.strip()
     
     state["final_message"] = clean_response
@@ -389,14 +604,21 @@ def should_continue(state: AgentState) -> str:
         return "reporter"
     
     if status in ["test_error", "incomplete"]:
+        # A speculative repair already produced the next test file
+        if state.get("speculative_ready"):
+            return "execute"
         return "generate"
     
     return "reporter"
 
 # --------------------- Build Graph -------------------
 
-def build_graph():
-    """Build the LangGraph workflow."""
+def build_graph(persist: bool = False):
+    """Build the LangGraph workflow.
+    
+    Checkpointing is off by default: a single Streamlit run never resumes a thread,
+    so snapshotting the whole state after every node is pure overhead.
+    """
     
     workflow = StateGraph(AgentState)
     
@@ -415,16 +637,104 @@ def build_graph():
         should_continue,
         {
             "generate": "generate",
+            "execute": "execute",
             "reporter": "reporter"
         }
     )
     workflow.add_edge("reporter", END)
     
-    memory = MemorySaver()
-    app = workflow.compile(checkpointer=memory)
+    app = workflow.compile(checkpointer=MemorySaver() if persist else None)
     
     return app
 
+async def stream_workflow(app, initial_state: dict, config: dict, events: queue.Queue) -> None:
+    """Stream the graph on the shared event loop, forwarding each node's output to `events`."""
+    try:
+        async for state in app.astream(initial_state, config):
+            events.put(state)
+    finally:
+        events.put(None)
+
+def progress_line(node_name: str, node_state: dict):
+    """One markdown line describing a finished node, or None for nodes that aren't shown."""
+    iteration = node_state.get('iteration', 1)
+    if node_name == "detect":
+        funcs = node_state.get('detected_functions', [])
+        return f"🔍 Detected {len(funcs)} functions: {', '.join(funcs[:5])}{'...' if len(funcs) > 5 else ''}"
+    if node_name == "generate":
+        return f"🤖 Iteration {iteration}: Generating {node_state.get('num_functions', 0)} tests..."
+    if node_name == "execute":
+        return f"⚙️ Iteration {iteration}: Executing tests..."
+    if node_name == "critic":
+        status = node_state.get('status', '')
+        if status == "success":
+            return f"✅ Iteration {iteration}: **All tests passed!**"
+        if status in ["test_error", "incomplete"]:
+            return f"🔄 Iteration {iteration}: Refining tests..."
+        if status == "source_error":
+            return f"❌ Iteration {iteration}: **Source code issue detected**"
+    return None
+
+def run_workflow(app, initial_state: dict, config: dict, progress_placeholder) -> dict:
+    """Run the graph on the shared loop, rendering progress from the script thread as nodes finish.
+    
+    All progress goes into a single placeholder that is redrawn once per batch of
+    queued events, instead of adding a new widget for every node.
+    """
+    events = queue.Queue()
+    future = asyncio.run_coroutine_threadsafe(stream_workflow(app, initial_state, config, events), get_event_loop())
+    
+    final_state = None
+    log_lines = []
+    finished = False
+    while not finished:
+        batch = [events.get()]
+        while not events.empty():
+            batch.append(events.get_nowait())
+        
+        for state in batch:
+            if state is None:
+                finished = True
+                break
+            final_state = state
+            node_name = list(state.keys())[0]
+            node_state = list(state.values())[0]
+            line = progress_line(node_name, node_state)
+            if line:
+                log_lines.append(line)
+        
+        progress_placeholder.markdown("\n\n".join(log_lines[-10:]))
+    
+    # Re-raise anything the workflow failed with
+    future.result()
+    return list(final_state.values())[0] if final_state else None
+
+RESULT_CACHE_SIZE = 32
+
+@st.cache_resource
+def get_result_cache() -> tuple:
+    """Successful workflow results keyed by (README hash, max iterations), shared across reruns and sessions."""
+    # LRU order, bounded by RESULT_CACHE_SIZE; the lock guards it across session threads
+    return OrderedDict(), threading.Lock()
+
+def get_cached_result(key: tuple):
+    """Return the cached result for key, marking it most recently used, or None."""
+    cache, lock = get_result_cache()
+    with lock:
+        result = cache.get(key)
+        if result is not None:
+            cache.move_to_end(key)
+        return result
+
+def put_cached_result(key: tuple, result: dict) -> None:
+    """Cache result under key, evicting the least recently used entry past RESULT_CACHE_SIZE."""
+    cache, lock = get_result_cache()
+    with lock:
+        cache[key] = result
+        cache.move_to_end(key)
+        while len(cache) > RESULT_CACHE_SIZE:
+            cache.popitem(last=False)
+
 # --------------------- Streamlit UI ----------------------
 
 st.markdown("Upload a README, and the AI will automatically detect functions and generate one test per function.")
@@ -432,6 +742,7 @@ st.markdown("Upload a README, and the AI will automatically detect functions and
 with st.sidebar:
     st.header("⚙️ Configuration")
     max_iterations = st.slider("Max iterations", 1, 5, 3)
+    speculative_repair = st.checkbox("Speculative repair", value=False, help="Draft the next fix in parallel with the critic. Saves an LLM round-trip on failing iterations at the cost of a wasted call on success.")
     st.info("System will generate one test per detected function (max 20 functions).")
     st.markdown("### Naming Convention")
     st.code("test1_functionName\ntest2_functionName\ntest3_functionName")
@@ -439,13 +750,19 @@ with st.sidebar:
 uploaded_file = st.file_uploader("Upload README.md", type=["md", "txt"])
 
 if uploaded_file:
-    readme_content = uploaded_file.read().decode("utf-8", errors="ignore")
+    readme_content = uploaded_file.getvalue().decode("utf-8", errors="ignore")
     
     with st.expander("📄 README Preview", expanded=False):
         st.code(readme_content, language="markdown")
     
     if st.button("🚀 Generate Function-Based Tests", type="primary"):
         
+        readme_hash = hashlib.blake2b(readme_content.encode("utf-8")).hexdigest()
+        cache_key = (readme_hash, max_iterations)
+        # A click on a README whose last run failed is a retry: skip the LLM disk cache,
+        # which would otherwise replay the same failing responses
+        failed_runs = st.session_state.setdefault("failed_runs", set())
+        
         initial_state = {
             "readme_content": readme_content,
             "detected_functions": [],
@@ -461,43 +778,32 @@ if uploaded_file:
             "feedback": "",
             "status": "",
             "final_message": "",
-            "history": []
+            "history": deque(maxlen=64),
+            "speculative_repair": speculative_repair,
+            "speculative_ready": False,
+            "refresh_llm_cache": cache_key in failed_runs
         }
         
-        app = build_graph()
-        config = {"configurable": {"thread_id": "test_generation_1"}}
-        
-        progress_container = st.container()
-        
-        with st.spinner("Running agentic workflow..."):
-            final_state = None
-            for state in app.stream(initial_state, config):
-                final_state = state
-                
-                if list(state.keys())[0] in ["detect", "generate", "execute", "critic"]:
-                    node_name = list(state.keys())[0]
-                    node_state = list(state.values())[0]
-                    
-                    with progress_container:
-                        if node_name == "detect":
-                            funcs = node_state.get('detected_functions', [])
-                            st.info(f"🔍 Detected {len(funcs)} functions: {', '.join(funcs[:5])}{'...' if len(funcs) > 5 else ''}")
-                        elif node_name == "generate":
-                            st.info(f"🤖 Iteration {node_state.get('iteration', 1)}: Generating {node_state.get('num_functions', 0)} tests...")
-                        elif node_name == "execute":
-                            st.info(f"⚙️ Iteration {node_state.get('iteration', 1)}: Executing tests...")
-                        elif node_name == "critic":
-                            status = node_state.get('status', '')
-                            if status == "success":
-                                st.success(f"✅ Iteration {node_state.get('iteration', 1)}: All tests passed!")
-                            elif status in ["test_error", "incomplete"]:
-                                st.warning(f"🔄 Iteration {node_state.get('iteration', 1)}: Refining tests...")
-                            elif status == "source_error":
-                                st.error(f"❌ Iteration {node_state.get('iteration', 1)}: Source code issue detected")
+        final_state = get_cached_result(cache_key)
+        if final_state is not None:
+            st.info("♻️ Reusing the results of an earlier successful run on this README.")
+        else:
+            app = build_graph()
+            config = {"configurable": {"thread_id": "test_generation_1"}}
+            
+            progress_placeholder = st.empty()
+            
+            with st.spinner("Running agentic workflow..."):
+                final_state = run_workflow(app, initial_state, config, progress_placeholder)
+            
+            # Only successes are cached so a failed run can simply be retried
+            if final_state and final_state["status"] == "success":
+                put_cached_result(cache_key, {**final_state, "history": list(final_state["history"])})
+                failed_runs.discard(cache_key)
+            else:
+                failed_runs.add(cache_key)
         
         if final_state:
-            final_state = list(final_state.values())[0]
-            
             st.divider()
             st.subheader("📊 Workflow Summary")
             
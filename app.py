@@ -1,8 +1,75 @@
+import asyncio
+import hashlib
+import pandas as pd
+from dataclasses import fields
 import streamlit as st
-from src.graph.builder import main_graph
+from src.graph.builder import get_main_graph
 from src.graph.state import GraphState
 from src.utils.parser import extract_functions_from_readme, extract_functions_from_python_file, detect_framework
 
+# ------------------ Cached upload helpers -----------------
+# Keyed on the raw upload bytes, so reruns with unchanged files skip the decode and regex scans
+_HASH_BYTES = {bytes: lambda b: hashlib.blake2b(b, digest_size=16).digest()}
+
+@st.cache_data(show_spinner=False, hash_funcs=_HASH_BYTES)
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="ignore")
+
+@st.cache_data(show_spinner=False)
+def _detect_readme(readme: str) -> list:
+    # Same decoded text the detect node scans, so the pre-check and the graph agree
+    return extract_functions_from_readme(readme)
+
+@st.cache_data(show_spinner=False, hash_funcs=_HASH_BYTES)
+def _detect_code(data: bytes) -> tuple:
+    code = _decode(data)
+    return extract_functions_from_python_file(code), detect_framework(code)
+
+# Compiled graph and LLM clients are shared by every session on this server
+@st.cache_resource(show_spinner=False)
+def _get_graph():
+    return get_main_graph()
+
+async def stream_workflow(main_graph, initial_state: GraphState, config: dict, status_slot) -> dict:
+    """Streams the graph on an asyncio loop, showing progress in status_slot; returns the merged final state."""
+    # Nodes stream only their updates; merge them into a running copy of the state
+    final_state = {f.name: getattr(initial_state, f.name) for f in fields(initial_state)}
+    async for state in main_graph.astream(initial_state, config, stream_mode="updates"):
+        node_name, delta = next(iter(state.items()))
+        final_state.update(delta or {})
+        node_state = final_state
+        
+        if node_name == "detect":
+            funcs = node_state.get('detected_functions', [])
+            fw = node_state.get('framework', 'generic')
+            status_slot.info(f"🔍 Detected {len(funcs)} functions in {fw.upper()} app: {', '.join(funcs[:8])}{'...' if len(funcs) > 8 else ''}")
+        elif node_name == "generate":
+            iter_num = node_state.get('iteration', 1)
+            fw = node_state.get('framework', 'generic')
+            if iter_num == 1:
+                status_slot.info(f"🤖 Iteration {iter_num}: Generating {node_state.get('num_functions', 0)} {fw}-aware tests...")
+            else:
+                status_slot.info(f"🔧 Iteration {iter_num}: Fixing tests based on feedback...")
+        elif node_name == "combine":
+            fw = node_state.get('framework', 'generic')
+            status_slot.info(f"🔗 Iteration {node_state.get('iteration', 1)}: Combining {fw} functions with tests...")
+        elif node_name == "execute":
+            status_slot.info(f"⚙️ Iteration {node_state.get('iteration', 1)}: Running pytest...")
+        elif node_name == "critic":
+            status = node_state.get('status', '')
+            iter_num = node_state.get('iteration', 1)
+            summary = node_state.get('report', {}).get('summary', {})
+            passed = summary.get('passed', 0)
+            collected = summary.get('collected', 0)
+            
+            if status == "success":
+                status_slot.success(f"✅ Iteration {iter_num}: All tests passed! ({passed}/{collected})")
+            elif status == "needs_fix":
+                status_slot.warning(f"🔄 Iteration {iter_num}: {passed}/{collected} tests passed - Fixing...")
+            elif status == "stalled":
+                status_slot.warning(f"⚠️ Iteration {iter_num}: No improvement detected - stopping")
+    return final_state
+
 # --------------------- Streamlit UI ----------------------
 
 st.set_page_config(page_title="Unit Test Generator with Feedback Loop", layout="wide")
@@ -38,7 +105,7 @@ with col1:
     
     readme_content = None
     if uploaded_file:
-        readme_content = uploaded_file.read().decode("utf-8", errors="ignore")
+        readme_content = _decode(uploaded_file.getvalue())
         with st.expander("Preview README", expanded=False):
             st.code(readme_content[:1000] + "..." if len(readme_content) > 1000 else readme_content, language="markdown")
 
@@ -48,103 +115,65 @@ with col2:
     
     user_functions = None
     if uploaded_functions_file:
-        user_functions = uploaded_functions_file.read().decode("utf-8", errors="ignore")
+        user_functions = _decode(uploaded_functions_file.getvalue())
         with st.expander("Preview Functions", expanded=False):
             st.code(user_functions[:1000] + "..." if len(user_functions) > 1000 else user_functions, language="python")
 
 st.divider()
 
-if readme_content and user_functions and st.button("🚀 Generate Tests & Run Feedback Loop", type="primary", use_container_width=True):
+if readme_content and user_functions:
+    # Results are kept per input set, so reruns (e.g. a download click) redisplay them instead of re-running the graph
+    # Each part is length-prefixed so text shifted across the README/code/iterations boundaries can't collide
+    run_hash = hashlib.sha256()
+    for part in (readme_content, user_functions, str(max_iterations)):
+        data = part.encode("utf-8")
+        run_hash.update(len(data).to_bytes(8, "little"))
+        run_hash.update(data)
+    run_key = run_hash.hexdigest()
+    
+    previous_state = st.session_state.get("final_state") if st.session_state.get("run_key") == run_key else None
+    # Only a successful result makes the button a no-op; after a failed or stalled run a click retries
+    if st.button("🚀 Generate Tests & Run Feedback Loop", type="primary", use_container_width=True) and not (previous_state and previous_state.get("status") == "success"):
+    
+        test_functions_readme = _detect_readme(readme_content)
+        test_functions_code, detected_framework = _detect_code(uploaded_functions_file.getvalue())
     
-    test_functions_readme = extract_functions_from_readme(readme_content)
-    test_functions_code = extract_functions_from_python_file(user_functions)
-    detected_framework = detect_framework(user_functions)
+        if not test_functions_readme and not test_functions_code:
+            st.error("""
+            ❌ **No functions detected!**
+        
+            Make sure your README includes function signatures like:
+            - `function_name()` in backticks
+            - `def function_name(` in code blocks
+            - Headers like `### function_name(args)`
+        
+            OR your Python file contains actual function definitions.
+            """)
+            st.stop()
     
-    if not test_functions_readme and not test_functions_code:
-        st.error("""
-        ❌ **No functions detected!**
-        
-        Make sure your README includes function signatures like:
-        - `function_name()` in backticks
-        - `def function_name(` in code blocks
-        - Headers like `### function_name(args)`
-        
-        OR your Python file contains actual function definitions.
-        """)
-        st.stop()
+        all_detected = test_functions_readme if test_functions_readme else test_functions_code
+        st.info(f"✅ Pre-check: Found {len(all_detected)} functions in {detected_framework.upper()} app: {', '.join(all_detected[:5])}{'...' if len(all_detected) > 5 else ''}")
     
-    all_detected = test_functions_readme if test_functions_readme else test_functions_code
-    st.info(f"✅ Pre-check: Found {len(all_detected)} functions in {detected_framework.upper()} app: {', '.join(all_detected[:5])}{'...' if len(all_detected) > 5 else ''}")
+        initial_state = GraphState(
+            readme_content=readme_content,
+            user_functions=user_functions,
+            max_iterations=max_iterations,
+        )
     
-    initial_state = GraphState(
-        readme_content=readme_content,
-        user_functions=user_functions,
-        detected_functions=[],
-        num_functions=0,
-        test_code="",
-        combined_code="",
-        iteration_results=[],
-        pytest_output="",
-        pytest_stderr="",
-        return_code=-1,
-        report={},
-        iteration=1,
-        max_iterations=max_iterations,
-        feedback="",
-        status="",
-        final_message="",
-        history=[],
-        framework="generic",
-        previous_errors=[]
-    )
+        config = {"configurable": {"thread_id": "streamlit_thread"}}
     
-    config = {"configurable": {"thread_id": "streamlit_thread"}}
+        # One slot overwritten per step instead of a new widget per node
+        status_slot = st.empty()
     
-    progress_container = st.container()
+        with st.spinner("🔄 Running workflow with feedback loop..."):
+            final_state = asyncio.run(stream_workflow(_get_graph(), initial_state, config, status_slot))
+        
+        st.session_state["final_state"] = final_state
+        st.session_state["run_key"] = run_key
+    
+    final_state = st.session_state.get("final_state") if st.session_state.get("run_key") == run_key else None
     
-    with st.spinner("🔄 Running workflow with feedback loop..."):
-        final_state = None
-        for state in main_graph.stream(initial_state, config):
-            final_state = state
-            
-            if list(state.keys())[0] in ["detect", "generate", "combine", "execute", "critic", "reporter"]:
-                node_name = list(state.keys())[0]
-                node_state = list(state.values())[0]
-                
-                with progress_container:
-                    if node_name == "detect":
-                        funcs = node_state.get('detected_functions', [])
-                        fw = node_state.get('framework', 'generic')
-                        st.info(f"🔍 Detected {len(funcs)} functions in {fw.upper()} app: {', '.join(funcs[:8])}{'...' if len(funcs) > 8 else ''}")
-                    elif node_name == "generate":
-                        iter_num = node_state.get('iteration', 1)
-                        fw = node_state.get('framework', 'generic')
-                        if iter_num == 1:
-                            st.info(f"🤖 Iteration {iter_num}: Generating {node_state.get('num_functions', 0)} {fw}-aware tests...")
-                        else:
-                            st.info(f"🔧 Iteration {iter_num}: Fixing tests based on feedback...")
-                    elif node_name == "combine":
-                        fw = node_state.get('framework', 'generic')
-                        st.info(f"🔗 Iteration {node_state.get('iteration', 1)}: Combining {fw} functions with tests...")
-                    elif node_name == "execute":
-                        st.info(f"⚙️ Iteration {node_state.get('iteration', 1)}: Running pytest...")
-                    elif node_name == "critic":
-                        status = node_state.get('status', '')
-                        iter_num = node_state.get('iteration', 1)
-                        summary = node_state.get('report', {}).get('summary', {})
-                        passed = summary.get('passed', 0)
-                        collected = summary.get('collected', 0)
-                        
-                        if status == "success":
-                            st.success(f"✅ Iteration {iter_num}: All tests passed! ({passed}/{collected})")
-                        elif status == "needs_fix":
-                            st.warning(f"🔄 Iteration {iter_num}: {passed}/{collected} tests passed - Fixing...")
-                        elif status == "stalled":
-                            st.warning(f"⚠️ Iteration {iter_num}: No improvement detected - stopping")
-
     if final_state:
-        final_state = list(final_state.values())[0]
-        
         st.divider()
         st.subheader("📊 Workflow Results")
         
@@ -172,18 +201,21 @@ if readme_content and user_functions and st.button("🚀 Generate Tests & Run Fe
         st.divider()
         st.subheader("📈 Progress Across Iterations")
         
-        for result in final_state["iteration_results"]:
-            col1, col2, col3, col4 = st.columns(4)
-            col1.write(f"**Iteration {result['iteration']}**")
-            col2.metric("Collected", result['collected'])
-            
-            delta_passed = None
-            if result['iteration'] > 1:
-                prev_passed = final_state["iteration_results"][result['iteration']-2]['passed']
-                delta_passed = result['passed'] - prev_passed
-            
-            col3.metric("Passed", result['passed'], delta=delta_passed)
-            col4.metric("Failed", result['failed'])
+        # One table instead of a row of metric widgets per iteration
+        if final_state["iteration_results"]:
+            progress_df = pd.DataFrame(final_state["iteration_results"], columns=["iteration", "collected", "passed", "failed"])
+            progress_df["Δ passed"] = progress_df["passed"].diff().astype("Int64")
+            st.dataframe(
+                progress_df,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "iteration": st.column_config.NumberColumn("Iteration"),
+                    "collected": st.column_config.NumberColumn("Collected"),
+                    "passed": st.column_config.NumberColumn("Passed"),
+                    "failed": st.column_config.NumberColumn("Failed"),
+                },
+            )
         
         st.divider()
         st.subheader("📝 Final Test Code")
@@ -195,24 +227,26 @@ if readme_content and user_functions and st.button("🚀 Generate Tests & Run Fe
         if final_state.get("report"):
             with st.expander("🔍 Detailed Test Results"):
                 tests = final_state["report"].get("tests", [])
-                for t in tests:
-                    nodeid = t.get("nodeid", "")
-                    outcome = t.get("outcome", "")
-                    if outcome == "passed":
-                        st.success(f"✅ {nodeid}")
-                    elif outcome == "failed":
-                        st.error(f"❌ {nodeid}")
-                        if t.get("longrepr"):
-                            st.code(t["longrepr"][:600], language="bash")
-                    elif outcome == "error":
-                        st.error(f"💥 {nodeid} (Error)")
+                # One markdown block per outcome group; only failures keep their own traceback widget
+                passed_md = "\n".join(f"- ✅ `{t.get('nodeid', '')}`" for t in tests if t.get("outcome") == "passed")
+                if passed_md:
+                    st.markdown(passed_md)
+                problems = [t for t in tests if t.get("outcome") in ("failed", "error")]
+                if problems:
+                    st.markdown("\n".join(
+                        f"- ❌ `{t.get('nodeid', '')}`" if t.get("outcome") == "failed" else f"- 💥 `{t.get('nodeid', '')}` (Error)"
+                        for t in problems
+                    ))
+                    for t in problems:
                         if t.get("longrepr"):
-                            st.code(t["longrepr"][:600], language="bash")
+                            st.code(f"{t.get('nodeid', '')}\n{t['longrepr']}", language="bash")
         
         with st.expander("📜 Execution History"):
-            for entry in final_state["history"]:
-                agent_emoji = {"detector": "🔍", "generator": "🤖", "combiner": "🔗", "executor": "⚙️", "critic": "🔬", "reporter": "📋"}.get(entry['agent'], "•")
-                st.write(f"{agent_emoji} **Iteration {entry['iteration']}** - {entry['agent'].title()}: {entry['action']}")
+            agent_emojis = {"detector": "🔍", "generator": "🤖", "combiner": "🔗", "executor": "⚙️", "critic": "🔬", "reporter": "📋"}
+            st.markdown("\n".join(
+                f"- {agent_emojis.get(entry['agent'], '•')} **Iteration {entry['iteration']}** - {entry['agent'].title()}: {entry['action']}"
+                for entry in final_state["history"]
+            ))
         
         col1, col2 = st.columns(2)
         with col1:
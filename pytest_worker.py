@@ -0,0 +1,58 @@
+"""
+In-process pytest runner for Version2.py.
+
+The pool is a process-wide singleton kept here rather than in a Streamlit cache,
+because it is used from the workflow's event-loop thread. The worker functions
+execute inside a spawned process, so they too have to live in an importable
+module rather than in the Streamlit script itself.
+"""
+import io
+import sys
+import threading
+import multiprocessing
+from contextlib import redirect_stdout, redirect_stderr
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the shared single-worker pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = multiprocessing.get_context("spawn").Pool(1, initializer=preimport_pytest)
+        return _pool
+
+
+def reset_pool():
+    """Terminate the worker (e.g. after a hung run); the next get_pool() starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.terminate()
+            _pool = None
+
+
+def preimport_pytest():
+    """Pool initializer - pays the pytest import cost once per worker."""
+    # The generated test file is rewritten every run, so cached bytecode is never reused
+    sys.dont_write_bytecode = True
+    import pytest  # noqa: F401
+    import pytest_jsonreport.plugin  # noqa: F401
+
+
+def run_pytest(args: list, module_name: str):
+    """Run pytest in this process; returns (exit_code, report, stdout, stderr)."""
+    import pytest
+    from pytest_jsonreport.plugin import JSONReport
+
+    # Forget the previous iteration's module so the rewritten file is imported fresh
+    sys.modules.pop(module_name, None)
+
+    # Collect the report in memory instead of round-tripping through .report.json
+    plugin = JSONReport()
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        exit_code = pytest.main([*args, "--json-report-file=none"], plugins=[plugin])
+    return (int(exit_code), plugin.report, stdout.getvalue(), stderr.getvalue())
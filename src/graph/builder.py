@@ -1,5 +1,4 @@
-import os
-from dotenv import load_dotenv
+from functools import lru_cache
 from langgraph.graph import StateGraph, END
 
 from .state import GraphState
@@ -12,40 +11,22 @@ from .nodes import (
     reporter_node,
 )
 
-from langchain_groq import ChatGroq
-
-# ------------------------- LLM Setup -------------------------
-# Load environment variables from .env file
-load_dotenv()
-
-# Ensure the API key is available
-if not os.getenv("GROQ_API_KEY"):
-    raise ValueError("GROQ_API_KEY not found in environment variables. Please set it in your .env file.")
-
-# Initialize the LLMs from the original app
-# Note: The model names below are from the original app.py.
-# You may need to update them to currently available models from Groq if you encounter errors.
-llm_generator = ChatGroq(model="openai/gpt-oss-20b", temperature=0.2)
-llm_critic = ChatGroq(model="meta-llama/llama-4-maverick-17b-128e-instruct", temperature=0.1)
-llm_reporter = ChatGroq(model="qwen/qwen3-32b", temperature=0.3)
-
-
 # --------------------- Routing Logic -------------------
 
 def should_continue(state: GraphState) -> str:
     """Decides the next step after the critic node."""
     print("--- Running Conditional Edge: should_continue ---")
     
-    status = state.get("status", "")
-    iteration = state.get("iteration", 0)
-    max_iterations = state.get("max_iterations", 3)
+    status = state.status
+    iteration = state.iteration
+    max_iterations = state.max_iterations
     
     if status == "success":
         print("Edge: Success. Moving to reporter.")
         return "reporter"
     
     if iteration > max_iterations:
-        state["status"] = "max_iterations"
+        state.status = "max_iterations"
         print(f"Edge: Max iterations ({max_iterations}) reached. Moving to reporter.")
         return "reporter"
     
@@ -96,5 +77,7 @@ def build_graph():
     print("--- Graph Compiled Successfully ---")
     return app
 
-# Create a global instance of the compiled graph
-main_graph = build_graph()
+@lru_cache(maxsize=None)
+def get_main_graph():
+    """Returns the compiled graph, building it on first use instead of at import time."""
+    return build_graph()
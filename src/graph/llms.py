@@ -0,0 +1,23 @@
+import os
+from functools import lru_cache
+
+from dotenv import load_dotenv
+from langchain_groq import ChatGroq
+
+# ------------------------- LLM Setup -------------------------
+# Load environment variables from .env file
+load_dotenv()
+
+@lru_cache(maxsize=None)
+def get_llms():
+    """Builds the (generator, critic, reporter) LLMs once per process and returns the same clients afterwards."""
+    # Ensure the API key is available
+    if not os.getenv("GROQ_API_KEY"):
+        raise ValueError("GROQ_API_KEY not found in environment variables. Please set it in your .env file.")
+
+    # Note: The model names below are from the original app.py.
+    # You may need to update them to currently available models from Groq if you encounter errors.
+    llm_generator = ChatGroq(model="openai/gpt-oss-20b", temperature=0.2)
+    llm_critic = ChatGroq(model="meta-llama/llama-4-maverick-17b-128e-instruct", temperature=0.1)
+    llm_reporter = ChatGroq(model="qwen/qwen3-32b", temperature=0.3)
+    return llm_generator, llm_critic, llm_reporter
@@ -1,8 +1,12 @@
 import os
-import json
 import re
-import subprocess
-from typing import Dict
+import atexit
+import shutil
+import orjson
+import asyncio
+import hashlib
+import tempfile
+from typing import Any, Dict
 
 from langchain_core.messages import HumanMessage
 
@@ -12,41 +16,87 @@ from ..utils.parser import (
     extract_functions_from_python_file,
     detect_framework,
     extract_code,
+    extract_json_object,
     extract_user_functions,
 )
-# LLMs will be imported from the builder
-from .builder import llm_generator, llm_critic, llm_reporter
+from ..utils.llm_cache import cached_invoke
+from .llms import get_llms
 
-# --- Test Execution ---
+# Top-level import lines stripped from the user's code before combining
+_IMPORTS_RE = re.compile(r'^(?:import\s+.*|from\s+\S+\s+import\s+.*)$', re.MULTILINE)
 
-def run_pytest_json(test_file: str, timeout_sec: int = 60):
-    """Run pytest and parse JSON report."""
-    # Ensure the report file from previous runs is deleted
-    if os.path.exists(".report.json"):
-        os.remove(".report.json")
+# --- Test Execution ---
 
-    cmd = ["pytest", test_file, "--disable-warnings", "--maxfail=20", "--json-report", "-q"]
+# One workspace per process, removed at exit; every run gets its own test and report file inside it
+_TMPDIR = tempfile.mkdtemp(prefix="testgen_")
+atexit.register(shutil.rmtree, _TMPDIR, ignore_errors=True)
+
+# Per-test traceback and stderr budgets, applied once when the report enters the state
+LONGREPR_LIMIT = 800
+STDERR_LIMIT = 2000
+
+def truncate_report(report: dict) -> dict:
+    """Cap every longrepr in the report; a failing stage's traceback is also exposed as the test's own longrepr."""
+    for test in report.get("tests", []):
+        for stage in ("setup", "call", "teardown"):
+            stage_report = test.get(stage)
+            if stage_report and stage_report.get("longrepr"):
+                stage_report["longrepr"] = stage_report["longrepr"][:LONGREPR_LIMIT]
+                test.setdefault("longrepr", stage_report["longrepr"])
+        if test.get("longrepr"):
+            test["longrepr"] = test["longrepr"][:LONGREPR_LIMIT]
+    return report
+
+async def run_pytest_json(test_file: str, timeout_sec: int = 60):
+    """Run pytest in a subprocess without blocking the event loop and parse the JSON report."""
+    # A private report file per run, so concurrent workflows don't read each other's results
+    fd, report_path = tempfile.mkstemp(prefix="report_", suffix=".json", dir=_TMPDIR)
+    os.close(fd)
+
+    # Load only the JSON report plugin instead of scanning every installed pytest plugin
+    cmd = ["pytest", test_file, "-p", "pytest_jsonreport.plugin", "-p", "no:cacheprovider", "-p", "no:doctest",
+           "--no-header", "--tb=short", "--disable-warnings", "--maxfail=20",
+           f"--rootdir={_TMPDIR}", "--import-mode=importlib",
+           "--json-report", f"--json-report-file={report_path}", "-q"]
+    # Each run's test file is new, so its bytecode would never be reused
+    env = {**os.environ, "PYTEST_DISABLE_PLUGIN_AUTOLOAD": "1", "PYTHONDONTWRITEBYTECODE": "1"}
     try:
-        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout_sec)
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, env=env
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout_sec)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return (-1, None, "", f"pytest timed out after {timeout_sec}s")
+
         report = None
-        if os.path.exists(".report.json"):
-            with open(".report.json", "r", encoding="utf-8") as f:
-                report = json.load(f)
-        return (proc.returncode, report, proc.stdout, proc.stderr)
+        if os.path.getsize(report_path):
+            with open(report_path, "rb") as f:
+                report = orjson.loads(f.read())
+        return (proc.returncode, report, stdout.decode("utf-8", errors="replace"), stderr.decode("utf-8", errors="replace"))
     except Exception as e:
         return (-1, None, "", str(e))
+    finally:
+        os.remove(report_path)
 
 # --------------------- Agent Nodes -------------------
+# Nodes read the state by attribute and return only the keys they changed.
+
+def _log(state: GraphState, agent: str, action: str) -> None:
+    """Records an action in the history, tagged with the current iteration, and echoes it."""
+    state.history.append({"agent": agent, "iteration": state.iteration, "action": action})
+    print(f"{agent.title()}: {action}")
 
-def function_detector_node(state: GraphState) -> GraphState:
+def function_detector_node(state: GraphState) -> Dict[str, Any]:
     """Detects functions from the README and the Python code."""
     print("--- Running Function Detector Node ---")
-    state['history'].append({"agent": "detector", "action": "Starting function detection."})
+    _log(state, "detector", "Starting function detection.")
 
-    functions_from_readme = extract_functions_from_readme(state["readme_content"])
-    functions_from_code = extract_functions_from_python_file(state["user_functions"])
-    framework = detect_framework(state["user_functions"])
-    state["framework"] = framework
+    functions_from_readme = extract_functions_from_readme(state.readme_content)
+    functions_from_code = extract_functions_from_python_file(state.user_functions)
+    framework = detect_framework(state.user_functions)
 
     if functions_from_readme:
         functions = functions_from_readme
@@ -58,23 +108,25 @@ def function_detector_node(state: GraphState) -> GraphState:
         functions = []
         action = "No functions detected in either README or code."
 
-    state["detected_functions"] = functions
-    state["num_functions"] = len(functions)
-    state['history'].append({"agent": "detector", "action": action})
-    print(f"Detector: {action}")
+    _log(state, "detector", action)
     
-    return state
-
-def test_generator_node(state: GraphState) -> GraphState:
+    return {
+        "framework": framework,
+        "detected_functions": functions,
+        "num_functions": len(functions),
+        "history": state.history,
+    }
+
+def test_generator_node(state: GraphState) -> Dict[str, Any]:
     """Generates test code based on the detected functions and framework."""
-    print(f"--- Running Test Generator Node (Iteration: {state['iteration']}) ---")
+    print(f"--- Running Test Generator Node (Iteration: {state.iteration}) ---")
     
-    feedback_text = state.get("feedback", "Generate comprehensive unit tests based on the README and provided functions.")
+    feedback_text = state.feedback or "Generate comprehensive unit tests based on the README and provided functions."
     
-    framework = state.get("framework", "generic")
-    function_list = ", ".join(state["detected_functions"])
-    readme_preview = state['readme_content'][:2500]
-    user_functions_preview = state['user_functions'][:2500]
+    framework = state.framework
+    function_list = ", ".join(state.detected_functions)
+    readme_preview = state.readme_content[:2500]
+    user_functions_preview = state.user_functions[:2500]
 
     framework_instructions = ""
     if framework == 'flask':
@@ -83,7 +135,7 @@ def test_generator_node(state: GraphState) -> GraphState:
         framework_instructions = "FASTAPI-SPECIFIC REQUIREMENTS:\n- Use `TestClient` from `fastapi.testclient`.\n- Test endpoints using `client.get()` or `client.post()`."
 
     prompt = f"""
-You are an expert Python test generator. Your task is to generate {state['num_functions']} unit tests.
+You are an expert Python test generator. Your task is to generate {state.num_functions} unit tests.
 
 DETECTED FUNCTIONS: {function_list}
 FRAMEWORK: {framework.upper()}
@@ -113,26 +165,24 @@ import pytest
 """
     
     messages = [HumanMessage(content=prompt)]
-    response = llm_generator.invoke(messages)
-    test_code = extract_code(response.content)
+    # Start near-deterministic, then sample more widely on each retry to escape repeated failures
+    temperature = min(0.1 + 0.2 * (state.iteration - 1), 0.5)
+    llm_generator, _, _ = get_llms()
+    test_code = extract_code(cached_invoke(llm_generator, messages, temperature=temperature))
     
-    state["test_code"] = test_code
-    action = f"Generated {state['num_functions']} test functions for {framework} framework."
-    state['history'].append({"agent": "generator", "action": action})
-    print(f"Generator: {action}")
+    _log(state, "generator", f"Generated {state.num_functions} test functions for {framework} framework.")
 
-    return state
+    return {"test_code": test_code, "history": state.history}
 
-def combiner_node(state: GraphState) -> GraphState:
+def combiner_node(state: GraphState) -> Dict[str, Any]:
     """Combines the user's functions and the generated tests into a single file for execution."""
     print("--- Running Combiner Node ---")
 
-    framework = state.get("framework", "generic")
-    filtered_functions = extract_user_functions(state['user_functions'], state['detected_functions'])
+    framework = state.framework
+    filtered_functions = extract_user_functions(state.user_functions, state.detected_functions)
     
     # Clean imports from user code to avoid conflicts
-    filtered_functions = re.sub(r'^import\s+.*$', '', filtered_functions, flags=re.MULTILINE)
-    filtered_functions = re.sub(r'^from\s+.*import\s+.*$', '', filtered_functions, flags=re.MULTILINE)
+    filtered_functions = _IMPORTS_RE.sub('', filtered_functions)
 
     if framework == 'flask':
         combined = f"""
@@ -148,86 +198,92 @@ def client():
     with app.test_client() as client:
         yield client
 
-{state['test_code']}
+{state.test_code}
 """
     else: # Generic or FastAPI
         combined = f"""
 {filtered_functions}
 
-{state['test_code']}
+{state.test_code}
 """
     
-    state["combined_code"] = combined
-    action = f"Combined code for {framework} framework."
-    state['history'].append({"agent": "combiner", "action": action})
-    print(f"Combiner: {action}")
+    _log(state, "combiner", f"Combined code for {framework} framework.")
     
-    return state
+    return {"combined_code": combined, "history": state.history}
 
-def execution_node(state: GraphState) -> GraphState:
+async def execution_node(state: GraphState) -> Dict[str, Any]:
     """Runs pytest on the combined code file."""
     print("--- Running Execution Node ---")
     
-    test_file_path = "test_combined.py"
-    with open(test_file_path, "w", encoding="utf-8") as f:
-        f.write(state["combined_code"])
-    
-    return_code, report, stdout, stderr = run_pytest_json(test_file_path)
+    # An identical file would reproduce the previous report, so keep it and flag the loop as stalled
+    combined_hash = hashlib.sha256(state.combined_code.encode("utf-8")).hexdigest()
+    if combined_hash == state.last_combined_hash:
+        _log(state, "executor", "Combined code unchanged since the last run; reusing the previous report.")
+        return {"status": "stalled", "history": state.history}
     
-    state["return_code"] = return_code
-    state["report"] = report or {}
-    state["pytest_output"] = stdout
-    state["pytest_stderr"] = stderr
+    # A private test file per run, so concurrent sessions can't overwrite each other's code mid-run
+    fd, test_file_path = tempfile.mkstemp(prefix="test_combined_", suffix=".py", dir=_TMPDIR)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(state.combined_code)
+        return_code, report, stdout, stderr = await run_pytest_json(test_file_path)
+    finally:
+        os.remove(test_file_path)
     
     summary = report.get("summary", {}) if report else {}
-    state["iteration_results"].append({
-        "iteration": state["iteration"],
+    state.iteration_results.append({
+        "iteration": state.iteration,
         "collected": summary.get("collected", 0),
         "passed": summary.get("passed", 0),
         "failed": summary.get("failed", 0),
         "errors": summary.get("errors", 0)
     })
     
-    action = f"Executed tests. Return code: {return_code}."
-    state['history'].append({"agent": "executor", "action": action})
-    print(f"Executor: {action}")
-
-    return state
-
-def critic_node(state: GraphState) -> GraphState:
+    _log(state, "executor", f"Executed tests. Return code: {return_code}.")
+
+    return {
+        "last_combined_hash": combined_hash,
+        "return_code": return_code,
+        "report": truncate_report(report) if report else {},
+        "pytest_output": stdout,
+        "pytest_stderr": stderr[:STDERR_LIMIT],
+        "iteration_results": state.iteration_results,
+        "history": state.history,
+    }
+
+def critic_node(state: GraphState) -> Dict[str, Any]:
     """Analyzes the test results and provides feedback."""
     print("--- Running Critic Node ---")
 
-    summary = state["report"].get("summary", {})
+    summary = state.report.get("summary", {})
     collected = summary.get("collected", 0)
     passed = summary.get("passed", 0)
     
+    if state.status == "stalled":
+        _log(state, "critic", f"STALLED - generator produced the same code; {passed}/{collected} tests passed.")
+        return {"history": state.history}
+
     if collected > 0 and passed == collected:
-        state["status"] = "success"
-        state["feedback"] = "All tests passed successfully."
-        action = f"SUCCESS - {passed}/{collected} tests passed."
-        state['history'].append({"agent": "critic", "action": action})
-        print(f"Critic: {action}")
-        return state
+        _log(state, "critic", f"SUCCESS - {passed}/{collected} tests passed.")
+        return {"status": "success", "feedback": "All tests passed successfully.", "history": state.history}
 
     failed_tests = []
-    if state["report"].get("tests"):
-        for test in state["report"]["tests"]:
-            if test.get("outcome") in ["failed", "error"]:
-                failed_tests.append({"name": test.get("nodeid", ""), "error": test.get("longrepr", "")[:400]})
+    for test in state.report.get("tests", []):
+        if test.get("outcome") in ["failed", "error"]:
+            failed_tests.append({"name": test.get("nodeid", ""), "error": test.get("longrepr", "")})
 
     prompt = f"""
 Analyze the pytest results and provide SPECIFIC, ACTIONABLE feedback for the test generator.
 
-FRAMEWORK: {state['framework'].upper()}
+FRAMEWORK: {state.framework.upper()}
 RESULTS: {passed}/{collected} passed.
-ITERATION: {state['iteration']} of {state['max_iterations']}
+ITERATION: {state.iteration} of {state.max_iterations}
 
 FAILED TESTS:
-{json.dumps(failed_tests[:3], indent=2)}
+{orjson.dumps(failed_tests[:3], option=orjson.OPT_INDENT_2).decode()}
 
 PYTEST STDERR:
-{state['pytest_stderr'][:800]}
+{state.pytest_stderr}
 
 YOUR TASK: Analyze the failures and provide concise feedback to fix the tests. Focus on what the *test generator* should do differently.
 
@@ -239,54 +295,60 @@ RESPONSE FORMAT (JSON only):
 """
     
     messages = [HumanMessage(content=prompt)]
-    response = llm_critic.invoke(messages)
+    _, llm_critic, _ = get_llms()
+    content = cached_invoke(llm_critic, messages)
     
+    # Replies often arrive fenced or wrapped in prose; parse just the JSON object inside
     try:
-        result = json.loads(response.content)
-    except json.JSONDecodeError:
+        result = orjson.loads(extract_json_object(content) or content)
+    except orjson.JSONDecodeError:
+        result = None
+    if not isinstance(result, dict):
         result = {"status": "needs_fix", "feedback": "Critic response was not valid JSON."}
 
-    state["status"] = result.get("status", "needs_fix")
-    state["feedback"] = result.get("feedback", "No feedback provided.")
-    
-    action = f"Analysis: {state['status']}. Feedback: {state['feedback']}"
-    state['history'].append({"agent": "critic", "action": action})
-    print(f"Critic: {action}")
+    status = result.get("status", "needs_fix")
+    feedback = result.get("feedback", "No feedback provided.")
+    _log(state, "critic", f"Analysis: {status}. Feedback: {feedback}")
 
-    if state["status"] == "needs_fix":
-        state["iteration"] += 1
+    iteration = state.iteration + 1 if status == "needs_fix" else state.iteration
         
-    return state
+    return {"status": status, "feedback": feedback, "iteration": iteration, "history": state.history}
 
-def reporter_node(state: GraphState) -> GraphState:
+def reporter_node(state: GraphState) -> Dict[str, Any]:
     """Generates the final report."""
     print("--- Running Reporter Node ---")
 
-    summary = state.get("report", {}).get("summary", {})
+    summary = state.report.get("summary", {})
     passed = summary.get("passed", 0)
     collected = summary.get("collected", 0)
 
+    # A clean pass needs no summarising, so the report is templated instead of asking the LLM
+    if state.status == "success" and passed == collected:
+        final_message = (
+            f"✅ All {passed}/{collected} tests passed for the {state.num_functions} detected functions "
+            f"({state.framework.upper()}) after {state.iteration} iteration{'s' if state.iteration != 1 else ''}."
+        )
+        _log(state, "reporter", "Final report generated from template.")
+        return {"final_message": final_message, "history": state.history}
+
     prompt = f"""
 Generate a concise final report for the user based on the workflow outcome.
 
-STATUS: {state['status']}
-ITERATIONS: {state['iteration']}
-FRAMEWORK: {state['framework'].upper()}
-FUNCTIONS DETECTED: {state['num_functions']}
+STATUS: {state.status}
+ITERATIONS: {state.iteration}
+FRAMEWORK: {state.framework.upper()}
+FUNCTIONS DETECTED: {state.num_functions}
 FINAL TEST RESULT: {passed}/{collected} passed.
 
 SUMMARY:
-{"All tests passed successfully!" if state['status'] == 'success' else "Could not achieve 100% pass rate within the iteration limit."}
+{"All tests passed successfully!" if state.status == 'success' else "Could not achieve 100% pass rate within the iteration limit."}
 
 Provide a brief, clear summary for the end-user.
 """
     
     messages = [HumanMessage(content=prompt)]
-    response = llm_reporter.invoke(messages)
-    
-    state["final_message"] = response.content
-    action = "Final report generated."
-    state['history'].append({"agent": "reporter", "action": action})
-    print(f"Reporter: {action}")
+    _, _, llm_reporter = get_llms()
+    final_message = cached_invoke(llm_reporter, messages)
+    _log(state, "reporter", "Final report generated.")
     
-    return state
+    return {"final_message": final_message, "history": state.history}
@@ -1,9 +1,18 @@
-from typing import TypedDict, List, Optional, Any
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, List
 
-class GraphState(TypedDict):
+# Bounds for the logs that grow on every node call / iteration
+HISTORY_LIMIT = 64
+PREVIOUS_ERRORS_LIMIT = 10
+
+@dataclass(slots=True)
+class GraphState:
     """
     Represents the state of our graph, adapted from the original app.py.
 
+    Slotted dataclass, so nodes use attribute access and every field has a default.
+
     Attributes:
         readme_content: The content of the README file.
         user_functions: The content of the user's Python code.
@@ -21,26 +30,28 @@ class GraphState(TypedDict):
         feedback: The feedback from the critic node to guide the next generation step.
         status: The current status of the graph (e.g., 'success', 'needs_fix').
         final_message: The final summary report.
-        history: A log of actions taken by each node.
+        history: A log of actions taken by each node (the most recent HISTORY_LIMIT entries).
         framework: The detected Python framework (e.g., 'flask', 'generic').
-        previous_errors: A list of errors from previous iterations.
+        previous_errors: Errors from previous iterations (the most recent PREVIOUS_ERRORS_LIMIT).
+        last_combined_hash: The sha256 of the combined code that was last executed.
     """
-    readme_content: str
-    user_functions: str
-    detected_functions: List[str]
-    num_functions: int
-    iteration_results: List[dict]
-    test_code: str
-    combined_code: str
-    pytest_output: str
-    pytest_stderr: str
-    return_code: int
-    report: dict
-    iteration: int
-    max_iterations: int
-    feedback: str
-    status: str
-    final_message: str
-    history: List[dict]
-    framework: str
-    previous_errors: List[str]
\ No newline at end of file
+    readme_content: str = ""
+    user_functions: str = ""
+    detected_functions: List[str] = field(default_factory=list)
+    num_functions: int = 0
+    iteration_results: List[dict] = field(default_factory=list)
+    test_code: str = ""
+    combined_code: str = ""
+    pytest_output: str = ""
+    pytest_stderr: str = ""
+    return_code: int = -1
+    report: dict = field(default_factory=dict)
+    iteration: int = 1
+    max_iterations: int = 3
+    feedback: str = ""
+    status: str = ""
+    final_message: str = ""
+    history: Deque[dict] = field(default_factory=lambda: deque(maxlen=HISTORY_LIMIT))
+    framework: str = "generic"
+    previous_errors: Deque[str] = field(default_factory=lambda: deque(maxlen=PREVIOUS_ERRORS_LIMIT))
+    last_combined_hash: str = ""
@@ -1,6 +1,8 @@
 import argparse
+import asyncio
 import sys
 import os
+from dataclasses import fields
 
 # Add the project root to the Python path to allow absolute imports
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -8,9 +10,34 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from src.utils import file_handler
-from src.graph.builder import main_graph
+from src.graph.builder import get_main_graph
 from src.graph.state import GraphState
 
+async def stream_graph(main_graph, initial_state: GraphState):
+    """
+    Streams the graph asynchronously, logging each node as it finishes.
+
+    Returns:
+        The final state as a dict, built by merging each node's updates.
+    """
+    # Nodes return only the keys they changed; merge them into a running copy of the state
+    final_state = {f.name: getattr(initial_state, f.name) for f in fields(initial_state)}
+    async for state_update in main_graph.astream(initial_state, stream_mode="updates"):
+        # state_update is a dictionary where the key is the node that just ran
+        node_name, node_output = next(iter(state_update.items()))
+        final_state.update(node_output or {})
+        
+        print(f"\n> Node '{node_name}' finished.")
+        
+        # You can add more detailed logging here if needed
+        if node_name == "critic":
+            status = final_state.get('status')
+            feedback = final_state.get('feedback')
+            print(f"  - Status: {status}")
+            print(f"  - Feedback: {feedback}")
+
+    return final_state
+
 def main():
     """
     The main entry point for the command-line application.
@@ -25,55 +52,20 @@ def main():
     print("--- Starting Test Generation Workflow ---")
 
     # 1. Read input files
-    readme_content = file_handler.read_file(args.readme)
-    if readme_content is None:
-        sys.exit(1) # Exit if file not found
-
-    user_functions = file_handler.read_file(args.code)
-    if user_functions is None:
+    readme_content, user_functions = file_handler.read_files([args.readme, args.code])
+    if readme_content is None or user_functions is None:
         sys.exit(1) # Exit if file not found
 
     # 2. Initialize the graph state
     initial_state = GraphState(
         readme_content=readme_content,
         user_functions=user_functions,
-        detected_functions=[],
-        num_functions=0,
-        test_code="",
-        combined_code="",
-        iteration_results=[],
-        pytest_output="",
-        pytest_stderr="",
-        return_code=-1,
-        report={},
-        iteration=1,
         max_iterations=args.max_iterations,
-        feedback="",
-        status="",
-        final_message="",
-        history=[],
-        framework="generic",
-        previous_errors=[]
     )
 
     # 3. Invoke the graph and stream results
     print("\n--- Invoking LangGraph ---")
-    final_state = None
-    for state_update in main_graph.stream(initial_state):
-        # state_update is a dictionary where the key is the node that just ran
-        node_name = list(state_update.keys())[0]
-        node_output = list(state_update.values())[0]
-        
-        print(f"\n> Node '{node_name}' finished.")
-        
-        # You can add more detailed logging here if needed
-        if node_name == "critic":
-            status = node_output.get('status')
-            feedback = node_output.get('feedback')
-            print(f"  - Status: {status}")
-            print(f"  - Feedback: {feedback}")
-
-        final_state = node_output
+    final_state = asyncio.run(stream_graph(get_main_graph(), initial_state))
 
     # 4. Print the final report
     print("\n--- Workflow Complete ---")
@@ -0,0 +1,40 @@
+import os
+import hashlib
+from functools import lru_cache
+from typing import Optional
+
+import diskcache
+
+# Shared with Version2.py's cache root, but kept in its own subdirectory
+LLM_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "testgen", "llm")
+
+@lru_cache(maxsize=None)
+def _get_cache() -> diskcache.Cache:
+    """Opens the on-disk cache on first use."""
+    return diskcache.Cache(LLM_CACHE_DIR)
+
+def cached_invoke(llm, messages: list, temperature: Optional[float] = None) -> str:
+    """
+    Invokes the LLM, reusing the stored response for an identical model, temperature and prompt.
+
+    Args:
+        llm: The chat model to call.
+        messages: The messages to send.
+        temperature: Overrides the model's temperature for this call, if given.
+
+    Returns:
+        The content of the model's response.
+    """
+    if temperature is None:
+        temperature = llm.temperature
+    key_source = f"{llm.model_name}|{temperature}|" + "\n".join(m.content for m in messages)
+    key = hashlib.blake2b(key_source.encode("utf-8"), digest_size=32).hexdigest()
+
+    cache = _get_cache()
+    content = cache.get(key)
+    if content is None:
+        # bind() reuses the existing client, only the request's temperature changes
+        runnable = llm if temperature == llm.temperature else llm.bind(temperature=temperature)
+        content = runnable.invoke(messages).content
+        cache.set(key, content)
+    return content
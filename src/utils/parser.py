@@ -1,130 +1,223 @@
 import re
 import ast
-from typing import List
+import sys
+import textwrap
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
 
-def extract_functions_from_readme(readme: str) -> List[str]:
-    """Extract function names from README using multiple patterns."""
-    functions = []
-    
-    # Pattern 1: def function_name( in code blocks
-    pattern1 = r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\('
-    functions.extend(re.findall(pattern1, readme))
-    
-    # Pattern 2: function_name(self) in method signatures
-    pattern2 = r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(self'
-    functions.extend(re.findall(pattern2, readme))
-    
+# README function-name patterns, compiled once at import.
+# Each pattern pairs with a literal that every match must contain, so a pattern whose
+# literal is absent from the README is skipped without running the regex at all.
+_FUNC_RES = (
+    # Pattern 1: def function_name( in code blocks (also covers method signatures)
+    ('def', re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(')),
     # Pattern 3: `function_name()` or `function_name(args)`
-    pattern3 = r'`([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)`'
-    functions.extend(re.findall(pattern3, readme))
-    
+    ('`', re.compile(r'`([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)`')),
     # Pattern 4: ### function_name(args) or ### function_name - headers with function calls
-    pattern4 = r'###\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\('
-    functions.extend(re.findall(pattern4, readme))
-    
+    ('###', re.compile(r'###\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(')),
     # Pattern 5: function_name(args) at start of line (not in code blocks)
-    pattern5 = r'^\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)(?:\s*$|\s*[-:])'
-    functions.extend(re.findall(pattern5, readme, re.MULTILINE))
-    
+    ('(', re.compile(r'^\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)(?:\s*$|\s*[-:])', re.MULTILINE)),
     # Pattern 6: **function_name(args)** in bold
-    pattern6 = r'\*\*([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)\*\*'
-    functions.extend(re.findall(pattern6, readme))
-    
+    ('**', re.compile(r'\*\*([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)\*\*')),
     # Pattern 7: - function_name(args) in lists
-    pattern7 = r'[-•]\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\('
-    functions.extend(re.findall(pattern7, readme))
-    
+    ('(', re.compile(r'[-•]\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\(')),
     # Pattern 8: Flask routes like GET /items - function_name()
-    pattern8 = r'[-•]\s*`[A-Z]+\s+/[^`]*`.*?[-–—]\s*`?([a-zA-Z_][a-zA-Z0-9_]*)\s*\('
-    functions.extend(re.findall(pattern8, readme))
-    
-    # Remove duplicates while preserving order
+    ('`', re.compile(r'[-•]\s*`[A-Z]+\s+/[^`]*`.*?[-–—]\s*`?([a-zA-Z_][a-zA-Z0-9_]*)\s*\(')),
+)
+# The same patterns with '-' as the only bullet. A leading character class gets no fast
+# prefix search in re, a single literal does, so READMEs without '•' use these.
+_FUNC_RES_DASH = tuple(
+    (literal, re.compile(pattern.pattern.replace('[-•]', '-', 1), pattern.flags))
+    for literal, pattern in _FUNC_RES
+)
+
+# LLM output cleanup
+# <think> blocks and ``` / ```python fences, removed in a single pass
+_STRIP_RE = re.compile(r"<think>.*?</think>|```(?:python)?", re.DOTALL | re.IGNORECASE)
+_PYTEST_RE = re.compile(r"<PYTEST_FILE>([\s\S]*?)</PYTEST_FILE>", re.IGNORECASE)
+
+# Common words that the patterns pick up but are not function names
+_STOPWORDS = frozenset(['module', 'key', 'class', 'object', 'property', 'input', 'output', 'returns', 'return'])
+
+def extract_functions_from_readme(readme: str) -> List[str]:
+    """Extract function names from README using multiple patterns."""
+    # Fresh list per call so callers can't mutate the cached result
+    return list(_extract_readme_cached(readme))
+
+def _iter_readme_candidates(readme: str) -> Iterator[str]:
+    """Lazily yield candidate names pattern by pattern; nothing past the consumer's stopping point is scanned."""
+    for literal, pattern in (_FUNC_RES if '•' in readme else _FUNC_RES_DASH):
+        if literal not in readme:
+            continue
+        for match in pattern.finditer(readme):
+            # Interned, so later membership tests and dict lookups on the name compare by identity first
+            yield sys.intern(match.group(1))
+
+@lru_cache(maxsize=64)
+def _extract_readme_cached(readme: str) -> Tuple[str, ...]:
+    """Cached body of extract_functions_from_readme, keyed by the README text."""
+    # Deduplicate while scanning, preserving order, and stop at the 20-name cap
     seen = set()
     unique_functions = []
-    for func in functions:
+    for func in _iter_readme_candidates(readme):
         # Skip private methods and common non-function words
-        if func not in seen and not func.startswith('_') and func.lower() not in ['module', 'key', 'class', 'object', 'property', 'input', 'output', 'returns', 'return']:
-            seen.add(func)
-            unique_functions.append(func)
+        if func in seen or func.startswith('_') or func.lower() in _STOPWORDS:
+            continue
+        seen.add(func)
+        unique_functions.append(func)
+        if len(unique_functions) >= 20:  # Max 20 functions
+            break
     
-    return unique_functions[:20]  # Max 20 functions
+    return tuple(unique_functions)
+
+# AST node classes are never subclassed, so exact type checks are enough and cheaper than isinstance
+_FuncDef = ast.FunctionDef
+_ClassDef = ast.ClassDef
+_If = ast.If
+_TRY_TYPES = (ast.Try, ast.TryStar) if hasattr(ast, 'TryStar') else (ast.Try,)
+
+def _iter_module_statements(body: List[ast.stmt]) -> Iterator[ast.stmt]:
+    """Yield a module's statements in order, descending into if/try blocks, whose definitions are still module-level."""
+    for node in body:
+        if type(node) is _If:
+            yield from _iter_module_statements(node.body)
+            yield from _iter_module_statements(node.orelse)
+        elif type(node) in _TRY_TYPES:
+            yield from _iter_module_statements(node.body)
+            for handler in node.handlers:
+                yield from _iter_module_statements(handler.body)
+            yield from _iter_module_statements(node.orelse)
+            yield from _iter_module_statements(node.finalbody)
+        else:
+            yield node
+
+@lru_cache(maxsize=32)
+def _cached_parse(code: str) -> ast.Module:
+    """Parse Python source once per distinct blob; callers only read the returned tree."""
+    # Same parser as ast.parse without its wrapper; no type comments or future flags from this module
+    return compile(code, '<string>', 'exec', flags=ast.PyCF_ONLY_AST, dont_inherit=True)
 
 def extract_functions_from_python_file(python_code: str) -> List[str]:
     """Extract function names directly from Python code using AST."""
     functions = []
     try:
-        tree = ast.parse(python_code)
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
+        tree = _cached_parse(python_code)
+        # Module-level functions first (including those under if/try, e.g. an ImportError fallback), then class methods
+        classes = []
+        for node in _iter_module_statements(tree.body):
+            if type(node) is _FuncDef:
                 if not node.name.startswith('_'):
                     functions.append(node.name)
+            elif type(node) is _ClassDef:
+                classes.append(node)
+        for cls in classes:
+            for item in cls.body:
+                if type(item) is _FuncDef and not item.name.startswith('_'):
+                    functions.append(item.name)
         return functions[:20]  # Max 20 functions
     except Exception:
         return []
 
+# First framework import in the file; case-insensitive, so no lowercased copy of the source is needed
+_FRAMEWORK_RE = re.compile(r'\b(?:from|import)\s+(flask|django|fastapi)\b', re.IGNORECASE)
+
+@lru_cache(maxsize=64)
 def detect_framework(user_code: str) -> str:
     """Detect if code uses Flask, Django, FastAPI, etc."""
-    code_lower = user_code.lower()
-    if 'from flask import' in code_lower or 'import flask' in code_lower:
-        return 'flask'
-    elif 'from django' in code_lower or 'import django' in code_lower:
-        return 'django'
-    elif 'from fastapi import' in code_lower or 'import fastapi' in code_lower:
-        return 'fastapi'
-    else:
-        return 'generic'
+    match = _FRAMEWORK_RE.search(user_code)
+    return match.group(1).lower() if match else 'generic'
 
 def extract_code(raw: str) -> str:
     """Clean the LLM output and extract pure Python code."""
     if not raw:
         return ""
     
-    raw = re.sub(r"<think>.*?</think>", "", raw, flags=re.DOTALL | re.IGNORECASE)
-    raw = re.sub(r"```(?:python)?", "", raw, flags=re.IGNORECASE)
-    raw = re.sub(r"```", "", raw)
+    # Plain code has neither marker, so skip the regex work entirely
+    has_tag = '<' in raw
+    if has_tag or '`' in raw:
+        raw = _STRIP_RE.sub("", raw)
     raw = raw.strip()
     
-    match = re.search(r"<PYTEST_FILE>([\s\S]*?)</PYTEST_FILE>", raw, re.IGNORECASE)
-    if match:
-        return match.group(1).strip()
+    # Without a '<' there is no <PYTEST_FILE> tag to search for
+    if has_tag:
+        match = _PYTEST_RE.search(raw)
+        if match:
+            return match.group(1).strip()
     
-    return raw.strip()
+    return raw
+
+_JSON_NOISE_RE = re.compile(r"<think>.*?</think>|```(?:json)?", re.DOTALL | re.IGNORECASE)
+
+def extract_json_object(raw: str) -> Optional[str]:
+    """Return the first balanced {...} block in an LLM reply (fences, <think> and braces inside strings ignored), or None."""
+    text = _JSON_NOISE_RE.sub("", raw or "")
+    start = text.find("{")
+    if start == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+# Import lines mentioning these packages are dropped from the extracted code
+_EXTERNAL_PKGS = ('requests', 'urllib3', 'chardet', 'idna')
+
+def _definition_source(lines: List[str], node: ast.stmt) -> str:
+    """Source of a definition; one nested in an if/try block is dedented to column 0."""
+    source = '\n'.join(lines[node.lineno-1:node.end_lineno])
+    return textwrap.dedent(source) if node.col_offset else source
 
 def extract_user_functions(user_code: str, detected_function_names: List[str]) -> str:
     """Extract only the detected functions/classes from user's code using AST."""
+    detected = frozenset(detected_function_names)
     try:
-        tree = ast.parse(user_code)
+        tree = _cached_parse(user_code)
         extracted_items = []
         extracted_names = set()
+        # Split once; every extracted definition slices this list
+        lines = user_code.split('\n')
         
-        for node in ast.walk(tree):
+        # Only module-level definitions are extracted, so there is no need to visit the whole tree
+        for node in _iter_module_statements(tree.body):
             # Extract standalone functions
-            if isinstance(node, ast.FunctionDef):
-                if node.name in detected_function_names and node.name not in extracted_names:
-                    func_lines = user_code.split('\n')[node.lineno-1:node.end_lineno]
-                    extracted_items.append('\n'.join(func_lines))
+            if type(node) is _FuncDef:
+                if node.name in detected and node.name not in extracted_names:
+                    extracted_items.append(_definition_source(lines, node))
                     extracted_names.add(node.name)
             
             # Extract entire class if any method matches
-            elif isinstance(node, ast.ClassDef):
-                class_has_target_method = False
-                for item in node.body:
-                    if isinstance(item, ast.FunctionDef) and item.name in detected_function_names:
-                        class_has_target_method = True
-                        break
-                
-                if class_has_target_method and node.name not in extracted_names:
-                    class_lines = user_code.split('\n')[node.lineno-1:node.end_lineno]
-                    extracted_items.append('\n'.join(class_lines))
+            # (name check first; isdisjoint stops at the first matching method)
+            elif type(node) is _ClassDef and node.name not in extracted_names:
+                if not detected.isdisjoint(item.name for item in node.body if type(item) is _FuncDef):
+                    extracted_items.append(_definition_source(lines, node))
                     extracted_names.add(node.name)
         
         if extracted_items:
             result = '\n\n'.join(extracted_items)
             # Keep essential imports that don't reference external packages
+            # (unindented only; an indented import belongs to a block and would not parse on its own)
             essential_imports = []
-            for line in user_code.split('\n'):
-                if line.strip().startswith('import ') or line.strip().startswith('from '):
-                    if not any(pkg in line for pkg in ['requests', 'urllib3', 'chardet', 'idna']):
+            for line in lines:
+                if line.startswith('import ') or line.startswith('from '):
+                    if not any(pkg in line for pkg in _EXTERNAL_PKGS):
                         essential_imports.append(line)
             
             if essential_imports:
@@ -0,0 +1,61 @@
+import pytest
+
+from src.utils.parser import (
+    extract_functions_from_python_file,
+    extract_functions_from_readme,
+    extract_user_functions,
+)
+
+
+@pytest.mark.parametrize("readme, expected", [
+    ("```python\ndef power(base, exp):\n```\n", ["power"]),
+    ("### multiply(a, b)\n", ["multiply"]),
+    ("Call `subtract(a, b)` first.\n", ["subtract"]),
+    ("**divide(a, b)**\n", ["divide"]),
+    ("\u2022 `GET /items` \u2013 list_items()\n", ["list_items"]),
+    # Non-ASCII whitespace around the name
+    ("- f\xa0(x)", ["f"]),
+    ("\xa0\xa0g(x) - d", ["g"]),
+    ("def\u2003h(x):", ["h"]),
+])
+def test_extract_functions_from_readme(readme, expected):
+    assert extract_functions_from_readme(readme) == expected
+
+
+def test_extract_functions_from_readme_skips_private_and_stopwords():
+    assert extract_functions_from_readme("- _hidden(x)\n- returns(x)\n- shown(x)\n") == ["shown"]
+
+
+def test_extract_functions_from_readme_orders_by_pattern():
+    # def signatures come before list items, whatever their position in the README
+    assert extract_functions_from_readme("- listed(x)\n\ndef defined(x):\n") == ["defined", "listed"]
+
+
+CODE_WITH_BRANCHES = '''
+def top(x):
+    return x
+
+try:
+    from fast import inside_try
+except ImportError:
+    def inside_try(x):
+        return x
+
+if True:
+    def inside_if(x):
+        return x
+
+class Box:
+    def get(self):
+        return 1
+'''
+
+
+def test_extract_functions_from_python_file_includes_if_and_try_definitions():
+    assert extract_functions_from_python_file(CODE_WITH_BRANCHES) == ["top", "inside_try", "inside_if", "get"]
+
+
+def test_extract_user_functions_dedents_nested_definitions():
+    extracted = extract_user_functions(CODE_WITH_BRANCHES, ["inside_if"])
+    assert "def inside_if(x):\n    return x" in extracted
+    compile(extracted, "<extracted>", "exec")